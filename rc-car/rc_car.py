@@ -1,7 +1,6 @@
 import asyncio
 import logging
 import sys
-import os
 
 from src.network.web_rtc_client import RCCarWebRTCClient
 from src.control.dummy_motor import DummyMotorController
@@ -17,8 +16,6 @@ def create_video_track():
 
 async def main():
     """Main entry point"""
-    import sys
-
     # Get room code from command line or use default
     room_code = sys.argv[1] if len(sys.argv) > 1 else "CAR001"
     signaling_url = sys.argv[2] if len(sys.argv) > 2 else "https://rc-signaling-serv-816336414350.europe-west1.run.app"
@@ -44,6 +41,14 @@ async def main():
     await car.run()
 
 if __name__ == "__main__":
+    try:
+        # Faster event loop for the socket and timer heavy WebRTC work
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        # Not available on Windows, fall back to the default loop
+        pass
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
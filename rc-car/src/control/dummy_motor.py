@@ -5,7 +5,9 @@ logger = logging.getLogger(__name__)
 
 class DummyMotorController(MotorController):
     def process_command(self, command: dict):
-        # Original logging logic
-        w = command.get('w', 0.0)
-        a = command.get('a', 0.0)
-        logger.info(f"CONTROL INPUT: W/S: {w:.2f} | A/D: {a:.2f}")
+        # Called for every control message, so only log (and format) when
+        # debug output is actually enabled
+        if logger.isEnabledFor(logging.DEBUG):
+            w = command.get('w', 0.0)
+            a = command.get('a', 0.0)
+            logger.debug("CONTROL INPUT: W/S: %.2f | A/D: %.2f", w, a)
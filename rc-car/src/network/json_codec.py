@@ -0,0 +1,15 @@
+import orjson
+
+
+def loads(data):
+    """
+    Parse JSON from str or bytes
+    """
+    return orjson.loads(data)
+
+
+def dumps(obj):
+    """
+    Serialize to a JSON str (socket.io payloads are text)
+    """
+    return orjson.dumps(obj).decode()
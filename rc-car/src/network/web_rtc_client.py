@@ -1,12 +1,31 @@
 import asyncio
-import json
 import logging
+import signal
 from aiortc import RTCPeerConnection, RTCSessionDescription, RTCIceCandidate, RTCConfiguration, RTCIceServer
 from aiortc.sdp import candidate_from_sdp
 import socketio
+import msgpack
+
+from . import json_codec
 
 logger = logging.getLogger(__name__)
 
+
+def decode_command(message):
+    """
+    Decode a control message: binary messages are a msgpack (w, a) pair,
+    text messages are the JSON object the Unity controller sends
+    """
+    if isinstance(message, bytes):
+        values = msgpack.unpackb(message, use_list=False)
+        if not (isinstance(values, tuple) and len(values) == 2
+                and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)):
+            raise ValueError(f"Expected a (w, a) pair of numbers, got {values!r}")
+        w, a = values
+        return {'w': w, 'a': a}
+    return json_codec.loads(message)
+
+
 class RCCarWebRTCClient:
     def __init__(self, room_code, signaling_url, motor_controller, video_track_factory):
         self.room_code = room_code
@@ -18,6 +37,12 @@ class RCCarWebRTCClient:
         self.pc = None
         self.video_track = None
         self.datachannel = None
+        self._stop = asyncio.Event()
+
+        # Only the newest control command matters, older ones are stale
+        self._latest_command = None
+        self._command_ready = asyncio.Event()
+        self._motor_task = None
 
         self._setup_socketio_events()
 
@@ -45,6 +70,10 @@ class RCCarWebRTCClient:
         async def on_ice_candidate(data):
             await self.handle_ice_candidate(data)
 
+    async def _emit(self, event, key, value):
+        """Send a signaling message addressed to this car's room"""
+        await self.sio.emit(event, {'roomCode': self.room_code, key: value})
+
     async def connect_signaling(self):
         """Connect to signaling server"""
         try:
@@ -70,9 +99,9 @@ class RCCarWebRTCClient:
         @self.datachannel.on("message")
         def on_message(message):
             try:
-                data = json.loads(message)
-                # Delegate to motor controller
-                self.motor_controller.process_command(data)
+                # Hand off to the motor loop, overwriting any unapplied command
+                self._latest_command = decode_command(message)
+                self._command_ready.set()
             except Exception as e:
                 logger.error(f"Failed to parse control data: {e}")
 
@@ -93,11 +122,27 @@ class RCCarWebRTCClient:
         async def on_connectionstatechange():
             logger.info(f"Connection state: {self.pc.connectionState}")
 
-        # Add video track from factory
+        # Add video track from factory. Encoder threading is left to aiortc:
+        # H.264 keeps PyAV's default of one slice thread per core, while VP8
+        # (the preferred codec) picks its own thread count and uses a single
+        # thread up to 640x480, which is enough for the test pattern.
         self.video_track = self.video_track_factory()
         self.pc.addTrack(self.video_track)
         logger.info("Video track added")
 
+    async def _motor_loop(self):
+        """Apply the latest control command whenever a new one arrives"""
+        while True:
+            await self._command_ready.wait()
+            self._command_ready.clear()
+            command, self._latest_command = self._latest_command, None
+
+            try:
+                # Delegate to motor controller
+                self.motor_controller.process_command(command)
+            except Exception as e:
+                logger.error(f"Failed to process control command: {e}")
+
     async def create_offer(self):
         """Create and send WebRTC offer"""
         try:
@@ -114,10 +159,7 @@ class RCCarWebRTCClient:
                 "sdp": self.pc.localDescription.sdp
             }
 
-            await self.sio.emit('offer', {
-                'roomCode': self.room_code,
-                'offer': json.dumps(offer_data)
-            })
+            await self._emit('offer', 'offer', json_codec.dumps(offer_data))
 
             logger.info("Offer sent")
 
@@ -128,7 +170,7 @@ class RCCarWebRTCClient:
         """Handle answer from controller"""
         try:
             answer_json = data.get('answer')
-            answer_data = json.loads(answer_json)
+            answer_data = json_codec.loads(answer_json)
 
             logger.info("Received answer")
 
@@ -147,7 +189,7 @@ class RCCarWebRTCClient:
         """Handle ICE candidate from controller"""
         try:
             candidate_json = data.get('candidate')
-            candidate_data = json.loads(candidate_json)
+            candidate_data = json_codec.loads(candidate_json)
 
             logger.info("Received ICE candidate")
 
@@ -164,16 +206,11 @@ class RCCarWebRTCClient:
         """Send ICE candidate to controller"""
         try:
             if candidate.candidate:
-                candidate_data = {
+                await self._emit('ice-candidate', 'candidate', json_codec.dumps({
                     "candidate": candidate.candidate,
                     "sdpMid": candidate.sdpMid,
                     "sdpMLineIndex": candidate.sdpMLineIndex
-                }
-
-                await self.sio.emit('ice-candidate', {
-                    'roomCode': self.room_code,
-                    'candidate': json.dumps(candidate_data)
-                })
+                }))
 
         except Exception as e:
             logger.error(f"Failed to send ICE candidate: {e}")
@@ -181,15 +218,17 @@ class RCCarWebRTCClient:
     async def run(self):
         """Main run loop"""
         try:
+            self._motor_task = asyncio.create_task(self._motor_loop())
             await self.connect_signaling()
 
             logger.info(f"RC Car Simulator running with room code: {self.room_code}")
             logger.info("Connect from Unity by selecting this car")
             logger.info("Press Ctrl+C to stop")
 
-            # Keep running
-            while True:
-                await asyncio.sleep(1)
+            # Keep running until a shutdown signal arrives
+            self._install_signal_handlers()
+            await self._stop.wait()
+            logger.info("Shutting down...")
 
         except KeyboardInterrupt:
             logger.info("Shutting down...")
@@ -198,13 +237,38 @@ class RCCarWebRTCClient:
         finally:
             await self.cleanup()
 
+    def stop(self):
+        """Ask the run loop to shut down"""
+        self._stop.set()
+
+    def _install_signal_handlers(self):
+        """Stop on SIGINT/SIGTERM instead of polling for a shutdown"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                # Windows event loops don't support signal handlers; Ctrl+C
+                # still raises KeyboardInterrupt there
+                pass
+
     async def cleanup(self):
         """Clean up resources"""
         logger.info("Cleaning up...")
 
+        if self._motor_task:
+            self._motor_task.cancel()
+            try:
+                await self._motor_task
+            except asyncio.CancelledError:
+                pass
+
         if self.pc:
             await self.pc.close()
 
+        if self.video_track:
+            self.video_track.stop()
+
         if self.sio.connected:
             await self.sio.disconnect()
 
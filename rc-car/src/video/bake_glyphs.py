@@ -0,0 +1,66 @@
+"""
+Pre-render the test pattern's frame counter glyphs into glyphs.npz, so the
+track doesn't need OpenCV at runtime.
+
+Development only, requires opencv-python-headless. Run from the rc-car
+directory after changing the font settings below:
+
+    python -m src.video.bake_glyphs
+"""
+import os
+import cv2
+import numpy as np
+
+TEXT_PREFIX = "Frame: "
+DIGITS = "0123456789"
+TEXT_FONT = cv2.FONT_HERSHEY_SIMPLEX
+TEXT_SCALE = 0.7
+TEXT_THICKNESS = 2
+
+OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "glyphs.npz")
+
+
+def text_width(text):
+    return cv2.getTextSize(text, TEXT_FONT, TEXT_SCALE, TEXT_THICKNESS)[0][0]
+
+
+def render(text, height, ascent, width=None):
+    """
+    Rasterize text as an alpha mask, with a TEXT_THICKNESS margin around
+    the pen position so thick strokes aren't clipped
+    """
+    width = width or text_width(text)
+    mask = np.zeros((height, width + 2 * TEXT_THICKNESS), dtype=np.uint8)
+    cv2.putText(mask, text, (TEXT_THICKNESS, ascent + TEXT_THICKNESS),
+                TEXT_FONT, TEXT_SCALE, 255, TEXT_THICKNESS)
+    return mask
+
+
+def bake():
+    """
+    Render the prefix and every digit, plus the pen advance of each glyph
+    """
+    (_, ascent), baseline = cv2.getTextSize(TEXT_PREFIX + DIGITS, TEXT_FONT, TEXT_SCALE, TEXT_THICKNESS)
+    height = ascent + baseline + 2 * TEXT_THICKNESS
+    digit_width = max(text_width(digit) for digit in DIGITS)
+
+    # Measured against a following glyph, so it matches putText's layout
+    advances = [text_width(text + "0") - text_width("0") for text in [TEXT_PREFIX, *DIGITS]]
+
+    return {
+        "prefix_text": np.array(TEXT_PREFIX),
+        "prefix": render(TEXT_PREFIX, height, ascent),
+        "digits": np.stack([render(digit, height, ascent, digit_width) for digit in DIGITS]),
+        "advances": np.array(advances),
+        "ascent": np.array(ascent),
+        "margin": np.array(TEXT_THICKNESS),
+    }
+
+
+def main():
+    np.savez_compressed(OUTPUT_PATH, **bake())
+    print(f"Wrote {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,60 @@
+import asyncio
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import cv2
 import av
 from aiortc import VideoStreamTrack
+from aiortc.mediastreams import MediaStreamError, VIDEO_CLOCK_RATE, VIDEO_TIME_BASE
 
 logger = logging.getLogger(__name__)
 
+# Frame counter overlay, glyphs pre-rendered by bake_glyphs.py
+TEXT_ORIGIN = (10, 30)
+GLYPHS_PATH = os.path.join(os.path.dirname(__file__), "glyphs.npz")
+
+# BT.601 limited range, the conversion swscale would otherwise apply per frame
+BGR_TO_YUV = np.array([
+    [0.097906, 0.504129, 0.256788],
+    [0.439216, -0.290993, -0.148223],
+    [-0.071427, -0.367788, 0.439216],
+])
+YUV_OFFSET = np.array([16, 128, 128])
+YUV_BLACK = (16, 128, 128)
+
+
+def bgr_to_yuv(bgr):
+    """
+    Convert an (N, 3) array of BGR colors to (N, 3) uint8 YUV
+    """
+    yuv = np.asarray(bgr, dtype=np.float64) @ BGR_TO_YUV.T + YUV_OFFSET
+    return np.clip(np.rint(yuv), 0, 255).astype(np.uint8)
+
+
+def plane_view(plane):
+    """
+    Writable (height, width) NumPy view over a VideoFrame plane, without the
+    row padding
+    """
+    rows = np.frombuffer(plane, dtype=np.uint8).reshape(-1, plane.line_size)
+    return rows[:plane.height, :plane.width]
+
+
+def blend(region, alpha, value):
+    """
+    Blend a flat value over region in place, using 0-255 alpha coverage
+    """
+    coverage = alpha / 255.0
+    region[:] = np.rint(region * (1.0 - coverage) + value * coverage)
+
+
 class TestPatternVideoTrack(VideoStreamTrack):
     """
     Generates a test pattern video stream (moving color bars)
     Perfect for testing without a real camera
+
+    Frames are produced directly in yuv420p, the encoder's native format,
+    so width and height must be even.
     """
 
     def __init__(self, width=640, height=480, fps=30):
@@ -18,18 +63,10 @@ class TestPatternVideoTrack(VideoStreamTrack):
         self.height = height
         self.fps = fps
         self.counter = 0
-        logger.info(f"Test pattern video track initialized: {width}x{height} @ {fps}fps")
-
-    async def recv(self):
-        """
-        Generate and return a test pattern video frame
-        """
-        pts, time_base = await self.next_timestamp()
-
-        # Create a test pattern (moving color bars)
-        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self._start_time = None
 
-        # Create moving vertical color bars
+        # The bars are identical every frame and only move horizontally, so
+        # build a single row once (converted to YUV) and shift it per frame
         bar_width = self.width // 7
         colors = [
             [255, 255, 255],  # White
@@ -40,27 +77,151 @@ class TestPatternVideoTrack(VideoStreamTrack):
             [255, 0, 0],  # Red
             [0, 0, 255],  # Blue
         ]
+        # width isn't a multiple of 7, so the leftover columns stay black
+        # as they always have
+        bars = np.repeat(np.array(colors, dtype=np.uint8), bar_width, axis=0)[:self.width]
+        yuv_row = bgr_to_yuv(np.pad(bars, ((0, self.width - len(bars)), (0, 0))))
+
+        # Store each row twice end to end: any cyclic shift of it is then a
+        # plain slice, so shifting allocates nothing per frame
+        yuv_row = np.concatenate([yuv_row, yuv_row])
+        self._y_row = np.ascontiguousarray(yuv_row[:, 0])
+        self._u_row = np.ascontiguousarray(yuv_row[:, 1])
+        self._v_row = np.ascontiguousarray(yuv_row[:, 2])
+
+        # Render straight into the planes of one reused VideoFrame, so there
+        # is no from_ndarray copy per frame. The frame object is shared with
+        # the encoder: it copies the picture inside encode(), which finishes
+        # before the next recv(), but may leave state such as pict_type set.
+        self._video_frame = av.VideoFrame(self.width, self.height, "yuv420p")
+        self._y_plane, self._u_plane, self._v_plane = (
+            plane_view(plane) for plane in self._video_frame.planes
+        )
+
+        self._load_glyphs()
+
+        # A single worker: frames share one VideoFrame and are built in order
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="test-pattern")
+
+        logger.info(f"Test pattern video track initialized: {width}x{height} @ {fps}fps")
+
+    def _load_glyphs(self):
+        """
+        Load the counter text glyphs: an alpha mask for the static prefix
+        and for each digit, plus the pen advance of every glyph
+        """
+        with np.load(GLYPHS_PATH) as glyphs:
+            self._text_prefix = str(glyphs["prefix_text"])
+            self._glyph_ascent = int(glyphs["ascent"])
+            self._glyph_margin = int(glyphs["margin"])
+            keys = [self._text_prefix, *"0123456789"]
+            masks = [glyphs["prefix"], *glyphs["digits"]]
+            self._glyphs = dict(zip(keys, masks))
+            self._advances = dict(zip(keys, glyphs["advances"].tolist()))
+
+    def _counter_alpha(self, counter):
+        """
+        Compose the cached "Frame: N" glyphs into one alpha mask.
+        Returns the mask and its top-left corner in frame coordinates.
+        """
+        x0 = TEXT_ORIGIN[0] - self._glyph_margin
+        y0 = TEXT_ORIGIN[1] - self._glyph_ascent - self._glyph_margin
+        alpha = np.zeros((self._glyphs[self._text_prefix].shape[0], max(self.width - x0, 0)), dtype=np.uint8)
+
+        # Combine the glyphs first so overlapping edges aren't blended twice
+        x = right = 0
+        for glyph_key in [self._text_prefix, *str(counter)]:
+            glyph = self._glyphs[glyph_key]
+            end = min(x + glyph.shape[1], alpha.shape[1])
+            if end <= x:
+                break
+            np.maximum(alpha[:, x:end], glyph[:, :end - x], out=alpha[:, x:end])
+            right = end
+            x += self._advances[glyph_key]
+
+        return alpha[:, :right], (y0, x0)
+
+    def _draw_counter(self, counter, y_plane, u_plane, v_plane):
+        """
+        Blend the frame counter onto the planes as black text
+        """
+        alpha, (y0, x0) = self._counter_alpha(counter)
+
+        # Clip to the frame like putText does, small frames cut the text off
+        h = min(alpha.shape[0], self.height - y0)
+        w = min(alpha.shape[1], self.width - x0)
+        if h <= 0 or w <= 0:
+            return
+        alpha = alpha[:h, :w]
+        blend(y_plane[y0:y0 + h, x0:x0 + w], alpha, YUV_BLACK[0])
+
+        # Average the coverage over the 2x2 blocks that share a chroma sample
+        pad_y, pad_x = y0 % 2, x0 % 2
+        ch, cw = (h + pad_y + 1) // 2, (w + pad_x + 1) // 2
+        padded = np.zeros((2 * ch, 2 * cw), dtype=np.uint16)
+        padded[pad_y:pad_y + h, pad_x:pad_x + w] = alpha
+        chroma_alpha = padded.reshape(ch, 2, cw, 2).sum(axis=(1, 3)) // 4
 
-        offset = (self.counter % self.width)
-        for i, color in enumerate(colors):
-            x_start = (i * bar_width + offset) % self.width
-            x_end = min(x_start + bar_width, self.width)
-            frame[:, x_start:x_end] = color
+        cy, cx = y0 // 2, x0 // 2
+        blend(u_plane[cy:cy + ch, cx:cx + cw], chroma_alpha, YUV_BLACK[1])
+        blend(v_plane[cy:cy + ch, cx:cx + cw], chroma_alpha, YUV_BLACK[2])
 
-            # Handle wraparound
-            if x_start + bar_width > self.width:
-                overflow = (x_start + bar_width) - self.width
-                frame[:, 0:overflow] = color
+    def _build_frame(self, counter):
+        """
+        Render frame number `counter` into the reused VideoFrame. Only NumPy
+        calls, so it can run off the event loop.
+        """
+        # Slice the doubled rows to get the bars shifted right by offset,
+        # wrapping around. Chroma is subsampled 2x in both directions.
+        offset = counter % self.width
+        start, end = self.width - offset, 2 * self.width - offset
+        y_row = self._y_row[start:end]
+        u_row = self._u_row[start:end:2]
+        v_row = self._v_row[start:end:2]
+
+        # Overwrite every pixel of the reused planes, then draw the text on top
+        np.copyto(self._y_plane, y_row)
+        np.copyto(self._u_plane, u_row)
+        np.copyto(self._v_plane, v_row)
+
+        # Add frame counter text from the pre-rendered glyphs
+        self._draw_counter(counter, self._y_plane, self._u_plane, self._v_plane)
+
+        # The VP8 encoder marks a forced keyframe by setting pict_type and
+        # never clears it, so reset it or every later frame is a keyframe
+        self._video_frame.pict_type = av.video.frame.PictureType.NONE
+
+        return self._video_frame
+
+    async def recv(self):
+        """
+        Generate and return a test pattern video frame
+        """
+        if self.readyState != "live":
+            raise MediaStreamError
 
-        # Add frame counter text using OpenCV
-        text = f"Frame: {self.counter}"
-        cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+        # Pace frames ourselves instead of next_timestamp(), which is fixed
+        # at 30fps. Deadlines are absolute, so sleep jitter doesn't drift.
+        loop = asyncio.get_running_loop()
+        if self._start_time is None:
+            self._start_time = loop.time()
+        else:
+            await asyncio.sleep(self._start_time + self.counter / self.fps - loop.time())
+        pts = int(self.counter * VIDEO_CLOCK_RATE // self.fps)
 
+        # Render in a worker thread so the event loop keeps serving ICE,
+        # the data channel and signaling while the frame is built
+        video_frame = await loop.run_in_executor(self._pool, self._build_frame, self.counter)
         self.counter += 1
 
-        # Convert to aiortc VideoFrame
-        video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
         video_frame.pts = pts
-        video_frame.time_base = time_base
+        video_frame.time_base = VIDEO_TIME_BASE
 
         return video_frame
+
+    def stop(self):
+        """
+        End the track and release the render thread
+        """
+        super().stop()
+        self._pool.shutdown(wait=False)